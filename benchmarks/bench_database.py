@@ -0,0 +1,357 @@
+"""
+Scale benchmarks for the database layer.
+
+For each scale it builds (or reuses) a synthetic database with generate_workload.py, then measures
+latency percentiles and captures the query plans of the functions app.py calls on every page load:
+get_deep_subject_preparation, get_weakest_topics_for_subject, get_distinct_classes_for_user,
+get_most_recent_class and save_quiz_results. The database size is recorded as well.
+
+The generated databases are deterministic (fixed seed, fixed GENERATED_UNTIL end time) and never
+modified: save_quiz_results is timed against a throwaway copy, and --maintenance compacts a separate
+taleemai_<scale>_maintained.db copy with a cutoff tied to GENERATED_UNTIL (baseline key "<scale>_maintained").
+
+Pass/fail against benchmarks/baselines.json only uses deterministic signals:
+- quiz_history row count must match (otherwise the dataset differs, use --rebuild)
+- page count may not grow by more than --size-tolerance
+- no statement may gain a full table SCAN compared to the baseline query plan
+Latency is machine-specific and informational only: each function is measured --repeats times, the
+median of the runs is reported, and p95 growth above both --tolerance and LATENCY_FLOOR_MS is printed
+as a warning without affecting the exit code.
+
+Usage:
+    python benchmarks/bench_database.py                          # small + medium, compare to baselines
+    python benchmarks/bench_database.py --scales large           # 10k users / 10M rows (slow, ~4 GB)
+    python benchmarks/bench_database.py --save-baseline          # record the current numbers as the baseline
+    python benchmarks/bench_database.py --maintenance            # measure a compacted copy (db.run_maintenance())
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_workload as gw
+import database as db
+
+DATA_DIR = os.path.join(REPO_ROOT, "benchmarks", "data")
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baselines.json")
+
+# name: (users, quiz_history rows, calls per function per repeat)
+SCALES = {
+    "small": (100, 10_000, 200),
+    "medium": (1_000, 1_000_000, 40),
+    "large": (10_000, 10_000_000, 8),
+}
+DEFAULT_SCALES = ["small", "medium"]
+GENERATED_UNTIL = datetime(2025, 1, 1)  # Fixed end time, so every generated database is identical
+HEAVY_USER_FRACTION = 0.01   # Half of the sampled users come from the most active 1%
+BENCHMARK_TOPIC = "Benchmark Topic"
+LATENCY_FLOOR_MS = 2.0       # p95 deltas below this are never reported, whatever the relative change
+
+# String and numeric literals, replaced by ? so one traced statement shape maps to one plan
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+class _TracingSqlite:
+    """Stands in for the sqlite3 module inside database.py and records every statement it executes."""
+    def __init__(self):
+        self.statements = []
+
+    def connect(self, *args, **kwargs):
+        conn = sqlite3.connect(*args, **kwargs)
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(sqlite3, name)
+
+def ensure_database(scale, rebuild=False):
+    """Returns the path of the generated database for `scale`, generating it if needed."""
+    users, rows, _ = SCALES[scale]
+    db_path = os.path.join(DATA_DIR, f"taleemai_{scale}.db")
+    if rebuild or not os.path.exists(db_path):
+        gw.generate(db_path, users, rows, end=GENERATED_UNTIL)
+    return db_path
+
+def maintained_copy(db_path, scale):
+    """Copies the generated database and runs db.run_maintenance() on the copy. Returns the copy's path."""
+    copy_path = os.path.join(DATA_DIR, f"taleemai_{scale}_maintained.db")
+    archive_dir = os.path.join(DATA_DIR, f"archive_{scale}_maintained")
+    shutil.copyfile(db_path, copy_path)
+    shutil.rmtree(archive_dir, ignore_errors=True)
+
+    # Retention is measured from the generator's end time, not from today, so the copy never drifts
+    cutoff = (GENERATED_UNTIL - timedelta(days=db.HISTORY_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    db.DB_NAME = copy_path
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.run_maintenance(archive_dir=archive_dir, cutoff=cutoff)
+    return copy_path
+
+@contextlib.contextmanager
+def scratch_copy(db_path):
+    """Points database.py at a throwaway copy of `db_path` so write benchmarks leave it untouched."""
+    copy_path = db_path[:-len(".db")] + "_scratch.db"
+    shutil.copyfile(db_path, copy_path)
+    previous = db.DB_NAME
+    db.DB_NAME = copy_path
+    try:
+        yield copy_path
+    finally:
+        db.DB_NAME = previous
+        os.remove(copy_path)
+
+def sample_users(db_path, iterations, seed=7):
+    """Picks (user_id, board, grade, subject) tuples, half from heavy users and half uniformly."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id FROM quiz_history GROUP BY user_id ORDER BY COUNT(*) DESC, user_id")
+    user_ids = [row[0] for row in cursor.fetchall()]
+    heavy = user_ids[:max(1, int(len(user_ids) * HEAVY_USER_FRACTION))]
+
+    rng = random.Random(seed)
+    picked = [rng.choice(heavy) if i % 2 == 0 else rng.choice(user_ids) for i in range(iterations)]
+
+    samples = []
+    for user_id in picked:
+        cursor.execute("SELECT board, grade, subject FROM quiz_history WHERE user_id = ? ORDER BY history_id LIMIT 1", (user_id,))
+        samples.append((user_id, *cursor.fetchone()))
+    conn.close()
+    return samples
+
+def build_calls():
+    """Returns {function name: (callable(sample), writes)} for every benchmarked database function."""
+    rng = random.Random(3)
+    filler = gw.build_filler(gw.load_classes())
+    questions = [{"question": f"{BENCHMARK_TOPIC}: {gw.random_text(rng, filler, gw.QUESTION_LENGTH)}?",
+                  "correct_answer": gw.random_text(rng, filler, gw.OPTION_LENGTH)}
+                 for _ in range(gw.QUESTIONS_PER_QUIZ)]
+    answers = [q["correct_answer"] if i % 2 == 0 else gw.random_text(rng, filler, gw.OPTION_LENGTH)
+               for i, q in enumerate(questions)]
+
+    def save(sample):
+        user_id, board, grade, subject = sample
+        context = {"board": board, "grade": grade, "subject": subject}
+        with contextlib.redirect_stdout(io.StringIO()):  # Silence the DEV LOG line
+            db.save_quiz_results(user_id, context, BENCHMARK_TOPIC, questions, answers)
+
+    return {
+        "get_deep_subject_preparation": (lambda s: db.get_deep_subject_preparation(s[0], s[1], s[2]), False),
+        "get_weakest_topics_for_subject": (lambda s: db.get_weakest_topics_for_subject(s[0], s[1], s[2], s[3]), False),
+        "get_distinct_classes_for_user": (lambda s: db.get_distinct_classes_for_user(s[0]), False),
+        "get_most_recent_class": (lambda s: db.get_most_recent_class(s[0]), False),
+        "save_quiz_results": (save, True),
+    }
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def statement_shape(statement):
+    """`statement` with whitespace collapsed and every literal replaced by ?."""
+    return _LITERAL_RE.sub("?", " ".join(statement.split()))
+
+def capture_query_plan(call, sample):
+    """Runs `call` once with tracing on and returns one EXPLAIN QUERY PLAN per distinct statement shape."""
+    tracer = _TracingSqlite()
+    db.sqlite3 = tracer
+    try:
+        call(sample)
+    finally:
+        db.sqlite3 = sqlite3
+
+    conn = sqlite3.connect(db.DB_NAME)
+    cursor = conn.cursor()
+    plans = []
+    seen = set()
+    for statement in tracer.statements:
+        shape = statement_shape(statement)
+        if not shape.upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")) or shape in seen:
+            continue
+        seen.add(shape)
+        cursor.execute("EXPLAIN QUERY PLAN " + statement)
+        plans.append({"sql": shape, "plan": [row[3] for row in cursor.fetchall()]})
+    conn.close()
+    return plans
+
+def full_scans(query_plan):
+    """The plan lines that scan a whole table (not a subquery, not through an index)."""
+    return {line for query in query_plan for line in query["plan"]
+            if line.startswith("SCAN") and not line.startswith("SCAN (") and "USING" not in line}
+
+def database_size(db_path):
+    """Returns the file size and the page/freelist counts of `db_path`."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    history_rows = cursor.execute("SELECT COUNT(*) FROM quiz_history").fetchone()[0]
+    conn.close()
+    return {
+        "db_size_bytes": os.path.getsize(db_path),
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "quiz_history_rows": history_rows,
+    }
+
+def time_calls(call, samples, repeats):
+    """Returns the median over `repeats` runs of each latency percentile (ms), plus the query plan of `call`."""
+    call(samples[0])  # Warm up the page cache & curriculum lookups
+    runs = []
+    for _ in range(repeats):
+        timings = []
+        for sample in samples:
+            started = time.perf_counter()
+            call(sample)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        runs.append({pct: percentile(timings, pct) for pct in (50, 95, 99)})
+    return {
+        "latency_ms": {f"p{pct}": round(statistics.median(run[pct] for run in runs), 3) for pct in (50, 95, 99)},
+        "query_plan": capture_query_plan(call, samples[0]),
+    }
+
+def run_scale(scale, iterations, repeats, rebuild=False, maintenance=False):
+    """Benchmarks every function against the database for `scale` and returns the results."""
+    db_path = ensure_database(scale, rebuild)
+    if maintenance:
+        db_path = maintained_copy(db_path, scale)
+    db.DB_NAME = db_path
+
+    samples = sample_users(db_path, iterations or SCALES[scale][2])
+    results = {**database_size(db_path), "functions": {}}
+
+    for name, (call, writes) in build_calls().items():
+        if writes:
+            with scratch_copy(db_path):
+                results["functions"][name] = time_calls(call, samples, repeats)
+        else:
+            results["functions"][name] = time_calls(call, samples, repeats)
+    return results
+
+def load_baselines():
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)["scales"]
+    return {}
+
+def save_baselines(baselines):
+    with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "note": "Row counts, page counts and query plans are checked. latency_ms is informational: "
+                    "it was recorded on the machine below and only produces warnings.",
+            "machine": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "cpus": os.cpu_count(),
+            },
+            "scales": baselines,
+        }, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+def compare_to_baseline(key, results, baseline, size_tolerance, tolerance):
+    """Returns (failures, warnings): deterministic regressions and informational latency changes."""
+    failures, warnings = [], []
+    if results["quiz_history_rows"] != baseline["quiz_history_rows"]:
+        failures.append(f"{key}: quiz_history has {results['quiz_history_rows']} rows, baseline has "
+                        f"{baseline['quiz_history_rows']} (stale or different dataset, rerun with --rebuild)")
+    if results["page_count"] > baseline["page_count"] * (1 + size_tolerance):
+        failures.append(f"{key}/page_count: {baseline['page_count']} -> {results['page_count']}")
+
+    for name, current in results["functions"].items():
+        previous = baseline["functions"].get(name)
+        if previous is None:
+            continue
+        new_scans = full_scans(current["query_plan"]) - full_scans(previous["query_plan"])
+        if new_scans:
+            failures.append(f"{key}/{name}: new full table scan(s) {sorted(new_scans)}")
+        elif current["query_plan"] != previous["query_plan"]:
+            warnings.append(f"{key}/{name}: query plan changed (no new full scans)")
+
+        before, after = previous["latency_ms"]["p95"], current["latency_ms"]["p95"]
+        if after > before * (1 + tolerance) and after - before > LATENCY_FLOOR_MS:
+            warnings.append(f"{key}/{name}: median p95 {before:.3f}ms -> {after:.3f}ms (informational)")
+    return failures, warnings
+
+def print_report(key, results):
+    users = SCALES[key.split("_")[0]][0]
+    print(f"\n=== {key}: {users} users, {results['quiz_history_rows']} quiz_history rows, "
+          f"{results['db_size_bytes'] / 1024 / 1024:.1f} MiB, {results['page_count']} pages "
+          f"({results['freelist_count']} free) ===")
+    print(f"{'function':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}   (median of repeats)")
+    for name, stats in results["functions"].items():
+        latency = stats["latency_ms"]
+        print(f"{name:<34}{latency['p50']:>10.3f}{latency['p95']:>10.3f}{latency['p99']:>10.3f}")
+    for name, stats in results["functions"].items():
+        for line in sorted(full_scans(stats["query_plan"])):
+            print(f"  ! {name}: full scan in plan -> {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TaleemAI database layer at several scales.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=DEFAULT_SCALES,
+                        help="Scales to run. Default: %(default)s")
+    parser.add_argument("--iterations", type=int, help="Calls per function per repeat. Default: per scale")
+    parser.add_argument("--repeats", type=int, default=3, help="Measurement runs per function; the median is kept. Default: %(default)s")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="p95 growth over the baseline reported as an (informational) latency warning. Default: %(default)s")
+    parser.add_argument("--size-tolerance", type=float, default=0.02,
+                        help="Allowed page count growth over the baseline. Default: %(default)s")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the synthetic databases.")
+    parser.add_argument("--maintenance", action="store_true", help="Measure a copy compacted with db.run_maintenance() (baseline key <scale>_maintained).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--output", help="Also write the full results (including query plans) to this JSON file.")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    all_results = {}
+    failures, warnings = [], []
+    for scale in args.scales:
+        key = f"{scale}_maintained" if args.maintenance else scale
+        results = run_scale(scale, args.iterations, args.repeats, args.rebuild, args.maintenance)
+        all_results[key] = results
+        print_report(key, results)
+        if key in baselines and not args.save_baseline:
+            scale_failures, scale_warnings = compare_to_baseline(key, results, baselines[key], args.size_tolerance, args.tolerance)
+            failures.extend(scale_failures)
+            warnings.extend(scale_warnings)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        baselines.update(all_results)
+        save_baselines(baselines)
+        print(f"\n--- DEV LOG: Baseline saved for {', '.join(all_results)} -> {BASELINE_FILE} ---")
+        return 0
+
+    if warnings:
+        print("\nWARNINGS (do not fail the run):")
+        for warning in warnings:
+            print(f"  - {warning}")
+    if failures:
+        print("\nREGRESSIONS:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    if not any(key in baselines for key in all_results):
+        print("\nNo baseline stored yet for these scales; run with --save-baseline to record one.")
+    else:
+        print("\nNo regressions against the stored baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Synthetic workload generator for the TaleemAI database.
+
+Fills a taleemai.db with users and quiz_history rows whose shape follows the real app:
+- every quiz is 10 questions on a single topic taken from curriculum.json
+- topic popularity inside each subject is Zipf-skewed (a few topics get most of the quizzes)
+- user activity is heavy-tailed (most users take a handful of quizzes, a few take thousands)
+- each user studies one class (board + grade), some of them a second one
+- question and answer-option text follow log-normal length distributions sized like the LLM-generated
+  quizzes app.py stores (full question text, full option text for both answers)
+- timestamps are spread over the `days` days before `end`, so retention/compaction has work to do;
+  pass a fixed `end` to get the same database on every run
+
+Usage:
+    python benchmarks/generate_workload.py --users 10000 --rows 10000000 --db benchmarks/data/taleemai_large.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import database as db
+import curriculum_handler as ch
+
+QUESTIONS_PER_QUIZ = 10   # Same as ai_handler.generate_topic_quiz(num_questions=10)
+TOPIC_ZIPF_EXPONENT = 1.1
+USER_PARETO_ALPHA = 1.2
+SECOND_CLASS_PROBABILITY = 0.2
+BATCH_SIZE = 50_000
+OPTIONS_PER_QUESTION = 4
+# Log-normal (median chars, sigma, min, max) fitted to GPT-generated MCQs: a one- or two-sentence question
+# and short-phrase options, with a long tail of worked-example questions and sentence-long options.
+QUESTION_LENGTH = (110, 0.45, 30, 600)
+OPTION_LENGTH = (28, 0.7, 1, 200)
+FILLER_WORDS = 200_000
+
+def build_filler(classes):
+    """Returns a long deterministic text made of curriculum words, sliced to produce question/option text."""
+    rng = random.Random(1)
+    vocabulary = sorted({word.strip("(),:'") for subjects in classes.values() for topics, _, _ in subjects.values()
+                         for topic in topics for word in topic.split()} - {""})
+    vocabulary += ["the", "of", "a", "is", "which", "what", "when", "following", "value", "body", "force", "unit"]
+    return " ".join(rng.choice(vocabulary) for _ in range(FILLER_WORDS))
+
+def random_text(rng, filler, length_spec):
+    """A slice of `filler` whose length is drawn from the log-normal `length_spec`."""
+    median, sigma, low, high = length_spec
+    length = min(high, max(low, int(rng.lognormvariate(0, sigma) * median)))
+    start = filler.find(" ", rng.randrange(len(filler) - length - 100)) + 1  # Start on a word
+    return filler[start:start + length].strip()
+
+def load_classes():
+    """Returns {(board, grade): {subject: (topics, zipf_weights, difficulties)}} built from curriculum.json."""
+    rng = random.Random(0)  # Topic popularity & difficulty are fixed, independent of the workload seed
+    classes = {}
+    for board in ch.get_boards():
+        for grade in ch.get_grades(board):
+            subjects = {}
+            for subject in ch.get_subjects_for_grade(board, grade):
+                topics = [topic for chapter in ch.get_chapters_for_subject(board, grade, subject)
+                          for topic in ch.get_topics_for_chapter(board, grade, subject, chapter)]
+                if not topics:
+                    continue
+                rng.shuffle(topics)
+                weights = [1 / (rank ** TOPIC_ZIPF_EXPONENT) for rank in range(1, len(topics) + 1)]
+                difficulties = [rng.uniform(-0.15, 0.15) for _ in topics]
+                subjects[subject] = (topics, weights, difficulties)
+            if subjects:
+                classes[(board, grade)] = subjects
+    return classes
+
+def plan_quizzes_per_user(rng, num_users, num_quizzes):
+    """Splits `num_quizzes` across users following a heavy-tailed (Pareto) activity distribution."""
+    activity = [rng.paretovariate(USER_PARETO_ALPHA) for _ in range(num_users)]
+    total_activity = sum(activity)
+    return [max(1, round(a / total_activity * num_quizzes)) for a in activity]
+
+def generate_rows(rng, classes, quizzes_per_user, days, end):
+    """Yields quiz_history rows (without history_id) for every planned quiz of every user."""
+    class_keys = list(classes)
+    filler = build_filler(classes)
+    span_seconds = days * 24 * 3600
+
+    for user_id, num_quizzes in enumerate(quizzes_per_user, start=1):
+        user_classes = [rng.choice(class_keys)]
+        if rng.random() < SECOND_CLASS_PROBABILITY:
+            user_classes.append(rng.choice(class_keys))
+        skill = rng.betavariate(5, 3)
+        start = rng.uniform(0, span_seconds)
+
+        # A user's quizzes are spread between the day they joined and today
+        offsets = sorted(rng.uniform(0, start) for _ in range(num_quizzes))
+        for offset in offsets:
+            board, grade = rng.choice(user_classes)
+            subject = rng.choice(list(classes[(board, grade)]))
+            topics, weights, difficulties = classes[(board, grade)][subject]
+            index = rng.choices(range(len(topics)), weights=weights)[0]
+            topic = topics[index]
+            p_correct = min(0.98, max(0.02, skill - difficulties[index]))
+            timestamp = (end - timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S")
+
+            for _ in range(QUESTIONS_PER_QUIZ):
+                question = f"{topic}: {random_text(rng, filler, QUESTION_LENGTH)}?"
+                correct_answer = random_text(rng, filler, OPTION_LENGTH)
+                is_correct = rng.random() < p_correct
+                user_answer = correct_answer if is_correct else random_text(rng, filler, OPTION_LENGTH)
+                yield (user_id, board, grade, subject, topic, question, user_answer, correct_answer, is_correct, timestamp)
+
+def generate(db_path, num_users, num_rows, days=365, seed=42, end=None):
+    """
+    Creates `db_path` from scratch and fills it with ~`num_rows` quiz_history rows for `num_users` users.
+    `end` (naive UTC datetime) is the newest possible answer time; defaults to now.
+    """
+    if end is None:
+        end = datetime.now(timezone.utc).replace(tzinfo=None)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    db.DB_NAME = db_path
+    db.init_db()
+
+    rng = random.Random(seed)
+    classes = load_classes()
+    quizzes_per_user = plan_quizzes_per_user(rng, num_users, max(1, num_rows // QUESTIONS_PER_QUIZ))
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # Bulk load only: durability does not matter for a throwaway benchmark database
+    cursor.execute("PRAGMA journal_mode = OFF")
+    cursor.execute("PRAGMA synchronous = OFF")
+
+    cursor.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)",
+                       ((user_id, f"user{user_id:06d}") for user_id in range(1, num_users + 1)))
+
+    rows = generate_rows(rng, classes, quizzes_per_user, days, end)
+    inserted = 0
+    while True:
+        batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+        if not batch:
+            break
+        cursor.executemany("""
+        INSERT INTO quiz_history (user_id, board, grade, subject, topic, question, user_answer, correct_answer, is_correct, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+        conn.commit()
+        inserted += len(batch)
+
+    cursor.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    print(f"--- DEV LOG: Generated {num_users} users and {inserted} quiz_history rows in "
+          f"{time.perf_counter() - started:.1f}s -> {db_path} ---")
+    return inserted
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a TaleemAI database with a synthetic quiz workload.")
+    parser.add_argument("--db", default=os.path.join(REPO_ROOT, "benchmarks", "data", db.DB_NAME),
+                        help="Database file to (re)create. Default: %(default)s")
+    parser.add_argument("--users", type=int, default=1_000, help="Number of users. Default: %(default)s")
+    parser.add_argument("--rows", type=int, default=100_000, help="Approximate number of quiz_history rows. Default: %(default)s")
+    parser.add_argument("--days", type=int, default=365, help="How far back the history goes. Default: %(default)s")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed. Default: %(default)s")
+    args = parser.parse_args()
+    generate(args.db, args.users, args.rows, args.days, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import json
+import os
+
+CURRICULUM_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'curriculum.json')
 
 def load_curriculum():
     """Loads the entire curriculum from the JSON file."""
-    with open('curriculum.json', 'r', encoding='utf-8') as f:
+    with open(CURRICULUM_FILE, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 CURRICULUM = load_curriculum()
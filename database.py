@@ -1,13 +1,27 @@
 import sqlite3
+import gzip
+import json
+import os
+import tempfile
 import curriculum_handler as ch # NEW: Required for the deep preparation logic
 
 DB_NAME = "taleemai.db"
 
+# --- Retention & Maintenance Settings ---
+HISTORY_RETENTION_DAYS = 90        # Raw answers older than this are folded into quiz_history_summary
+ARCHIVE_DIR = "archive"            # Where the archived raw rows are written (gzipped JSON lines)
+MAINTENANCE_INTERVAL_HOURS = 24    # How often run_scheduled_maintenance() actually does the work
+MAINTENANCE_LOCK_TIMEOUT_HOURS = 6 # An unfinished run older than this is treated as crashed
+COMPACTION_BATCH_SIZE = 5_000      # Rows archived per write transaction, keeps the write lock short
+
 def init_db():
     """Initializes the database and creates/upgrades tables."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
 
+    # Only takes effect on a brand new database file; existing files are converted by migrate_auto_vacuum()
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     # Create the 'users' table
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS users (
@@ -33,6 +47,38 @@ def init_db():
         FOREIGN KEY (user_id) REFERENCES users (user_id)
     )
     """)
+
+    # Create the 'quiz_history_summary' table: compacted per-user/per-topic totals for archived answers
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS quiz_history_summary (
+        user_id INTEGER NOT NULL,
+        board TEXT NOT NULL,
+        grade TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        total_answers INTEGER NOT NULL,
+        correct_answers INTEGER NOT NULL,
+        last_timestamp DATETIME NOT NULL,
+        PRIMARY KEY (user_id, board, grade, subject, topic),
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    """)
+
+    # Create the 'maintenance_runs' table: one row per run, finished_at stays NULL while it is in progress
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ran_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        rows_archived INTEGER NOT NULL,
+        finished_at DATETIME
+    )
+    """)
+
+    # Upgrade: older 'maintenance_runs' tables have no finished_at column; their runs all finished
+    cursor.execute("PRAGMA table_info(maintenance_runs)")
+    if "finished_at" not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE maintenance_runs ADD COLUMN finished_at DATETIME")
+        cursor.execute("UPDATE maintenance_runs SET finished_at = ran_at")
     conn.commit()
     conn.close()
 
@@ -89,7 +135,11 @@ def get_distinct_classes_for_user(user_id):
     """Finds all unique Board-Grade combinations a user has been quizzed on."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT board, grade FROM quiz_history WHERE user_id = ?", (user_id,))
+    cursor.execute("""
+    SELECT board, grade FROM quiz_history WHERE user_id = ?
+    UNION
+    SELECT board, grade FROM quiz_history_summary WHERE user_id = ?
+    """, (user_id, user_id))
     classes = cursor.fetchall()
     conn.close()
     return [{'board': row[0], 'grade': row[1]} for row in classes]
@@ -98,7 +148,14 @@ def get_most_recent_class(user_id):
     """Finds the most recent Board and Grade a user was quizzed on."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
-    cursor.execute("SELECT board, grade FROM quiz_history WHERE user_id = ? ORDER BY timestamp DESC LIMIT 1", (user_id,))
+    cursor.execute("""
+    SELECT board, grade FROM (
+        SELECT board, grade, timestamp FROM quiz_history WHERE user_id = ?
+        UNION ALL
+        SELECT board, grade, last_timestamp FROM quiz_history_summary WHERE user_id = ?
+    )
+    ORDER BY timestamp DESC LIMIT 1
+    """, (user_id, user_id))
     recent_class = cursor.fetchone()
     conn.close()
     return {'board': recent_class[0], 'grade': recent_class[1]} if recent_class else None
@@ -120,14 +177,23 @@ def get_deep_subject_preparation(user_id, board, grade):
             performance[subject] = 0.0
             continue
 
-        # 2. Get the NUMERATOR: Find all topics the user has "mastered" (scored >= 70%)
+        # 2. Get the NUMERATOR: Find all topics the user has "mastered" (scored >= 70%),
+        #    counting both the raw answers and the compacted (archived) totals
         cursor.execute("""
             SELECT topic
-            FROM quiz_history
-            WHERE user_id = ? AND board = ? AND grade = ? AND subject = ?
+            FROM (
+                SELECT topic, COUNT(*) AS total, SUM(is_correct) AS correct
+                FROM quiz_history
+                WHERE user_id = ? AND board = ? AND grade = ? AND subject = ?
+                GROUP BY topic
+                UNION ALL
+                SELECT topic, total_answers, correct_answers
+                FROM quiz_history_summary
+                WHERE user_id = ? AND board = ? AND grade = ? AND subject = ?
+            )
             GROUP BY topic
-            HAVING AVG(is_correct) >= 0.70
-        """, (user_id, board, grade, subject))
+            HAVING SUM(correct) * 1.0 / SUM(total) >= 0.70
+        """, (user_id, board, grade, subject, user_id, board, grade, subject))
         
         mastered_topics = cursor.fetchall()
         count_mastered = len(mastered_topics)
@@ -144,13 +210,191 @@ def get_weakest_topics_for_subject(user_id, board, grade, subject, limit=3):
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute("""
-    SELECT topic, COUNT(*) as incorrect_count
-    FROM quiz_history
-    WHERE user_id = ? AND board = ? AND grade = ? AND subject = ? AND is_correct = 0
+    SELECT topic, SUM(incorrect) as incorrect_count
+    FROM (
+        SELECT topic, COUNT(*) AS incorrect
+        FROM quiz_history
+        WHERE user_id = ? AND board = ? AND grade = ? AND subject = ? AND is_correct = 0
+        GROUP BY topic
+        UNION ALL
+        SELECT topic, total_answers - correct_answers
+        FROM quiz_history_summary
+        WHERE user_id = ? AND board = ? AND grade = ? AND subject = ?
+    )
     GROUP BY topic
+    HAVING incorrect_count > 0
     ORDER BY incorrect_count DESC
     LIMIT ?
-    """, (user_id, board, grade, subject, limit))
+    """, (user_id, board, grade, subject, user_id, board, grade, subject, limit))
     weak_topics = [row[0] for row in cursor.fetchall()]
     conn.close()
-    return weak_topics
\ No newline at end of file
+    return weak_topics
+
+# --- Retention, Archival & Maintenance ---
+# These are run from maintenance.py (cron / CLI), never from the Streamlit page load.
+def _archive_batch(cursor, cutoff, after_id, batch_size, archive_dir):
+    """
+    Writes the next batch of raw rows older than `cutoff` to a temporary gzipped JSON-lines file.
+    Only reads, so no write lock is held. Returns (first_id, last_id, row_count, temp_path, final_path) or None.
+    """
+    cursor.execute("""
+        SELECT history_id, user_id, board, grade, subject, topic, question, user_answer, correct_answer, is_correct, timestamp
+        FROM quiz_history
+        WHERE history_id > ? AND timestamp < ?
+        ORDER BY history_id
+        LIMIT ?
+    """, (after_id, cutoff, batch_size))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    columns = [col[0] for col in cursor.description]
+    first_id, last_id = rows[0][0], rows[-1][0]
+    final_path = os.path.join(archive_dir, f"quiz_history_{first_id}_{last_id}.jsonl.gz")
+    fd, temp_path = tempfile.mkstemp(dir=archive_dir, prefix=f"quiz_history_{first_id}_{last_id}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+    return first_id, last_id, len(rows), temp_path, final_path
+
+def compact_quiz_history(retention_days=HISTORY_RETENTION_DAYS, archive_dir=ARCHIVE_DIR, batch_size=COMPACTION_BATCH_SIZE, cutoff=None):
+    """
+    Folds raw answers older than `retention_days` (or than an explicit 'YYYY-MM-DD HH:MM:SS' UTC `cutoff`)
+    into quiz_history_summary in batches of `batch_size`.
+    Each batch is archived to a gzipped JSON-lines file first, then summarised and deleted in its own
+    short transaction; the archive file only gets its final name once that transaction has committed.
+    Returns the number of rows archived.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    if cutoff is None:
+        # Same 'YYYY-MM-DD HH:MM:SS' UTC format CURRENT_TIMESTAMP writes the rows with
+        cursor.execute("SELECT datetime('now', ?)", (f"-{retention_days} days",))
+        cutoff = cursor.fetchone()[0]
+    rows_archived = 0
+    after_id = 0
+
+    while True:
+        batch = _archive_batch(cursor, cutoff, after_id, batch_size, archive_dir)
+        if batch is None:
+            break
+        first_id, last_id, row_count, temp_path, final_path = batch
+
+        # Rows older than the cutoff are never written by the app, so the id range still matches the archive
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                INSERT INTO quiz_history_summary (user_id, board, grade, subject, topic, total_answers, correct_answers, last_timestamp)
+                SELECT user_id, board, grade, subject, topic, COUNT(*), SUM(is_correct), MAX(timestamp)
+                FROM quiz_history
+                WHERE history_id BETWEEN ? AND ? AND timestamp < ?
+                GROUP BY user_id, board, grade, subject, topic
+                ON CONFLICT (user_id, board, grade, subject, topic) DO UPDATE SET
+                    total_answers = total_answers + excluded.total_answers,
+                    correct_answers = correct_answers + excluded.correct_answers,
+                    last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+            """, (first_id, last_id, cutoff))
+            cursor.execute("DELETE FROM quiz_history WHERE history_id BETWEEN ? AND ? AND timestamp < ?",
+                           (first_id, last_id, cutoff))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, final_path)
+        rows_archived += row_count
+        after_id = last_id
+
+    conn.close()
+    if rows_archived:
+        print(f"--- DEV LOG: Archived {rows_archived} quiz_history rows to {archive_dir} ---")
+    return rows_archived
+
+def migrate_auto_vacuum():
+    """
+    One-time migration: switches a database created before auto_vacuum was enabled to INCREMENTAL.
+    Runs a full VACUUM, which locks the whole database, so only run it while the app is stopped.
+    Returns True if the database was migrated, False if it already was.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] == 2:
+        conn.close()
+        return False
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("VACUUM")
+    conn.close()
+    print("--- DEV LOG: Database migrated to incremental auto_vacuum ---")
+    return True
+
+def _claim_maintenance_run(interval_hours):
+    """
+    Atomically records a new, unfinished maintenance run. Returns its run_id, or None if another run is
+    still in progress or one finished within the last `interval_hours` (0 only checks for a running one).
+    """
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("""
+        INSERT INTO maintenance_runs (rows_archived)
+        SELECT 0
+        WHERE NOT EXISTS (SELECT 1 FROM maintenance_runs WHERE finished_at IS NULL AND ran_at > datetime('now', ?))
+          AND NOT EXISTS (SELECT 1 FROM maintenance_runs WHERE finished_at IS NOT NULL AND ran_at > datetime('now', ?))
+    """, (f"-{MAINTENANCE_LOCK_TIMEOUT_HOURS} hours", f"-{interval_hours} hours"))
+    run_id = cursor.lastrowid if cursor.rowcount == 1 else None
+    conn.commit()
+    conn.close()
+    return run_id
+
+def _release_maintenance_run(run_id):
+    """Drops the claim of a run that failed, so the next scheduled run is not skipped."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute("DELETE FROM maintenance_runs WHERE run_id = ?", (run_id,))
+    conn.commit()
+    conn.close()
+
+def run_maintenance(retention_days=HISTORY_RETENTION_DAYS, archive_dir=ARCHIVE_DIR, interval_hours=0, cutoff=None):
+    """
+    Compacts old history, reclaims free pages and refreshes the query planner statistics.
+    Returns the number of rows archived, or None if skipped because another run holds the claim
+    (or, with `interval_hours`, because a run already finished within that window).
+    """
+    run_id = _claim_maintenance_run(interval_hours)
+    if run_id is None:
+        return None
+
+    try:
+        rows_archived = compact_quiz_history(retention_days, archive_dir, cutoff=cutoff)
+
+        conn = sqlite3.connect(DB_NAME)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] == 2:
+            # executescript() steps the pragma to completion; execute() would free a single page
+            conn.executescript("PRAGMA incremental_vacuum")
+        else:
+            print("--- DEV LOG: auto_vacuum is not INCREMENTAL, run `python maintenance.py --migrate` once ---")
+
+        cursor.execute("ANALYZE")
+        cursor.execute("PRAGMA optimize")
+
+        cursor.execute("UPDATE maintenance_runs SET rows_archived = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?",
+                       (rows_archived, run_id))
+        conn.commit()
+        conn.close()
+    except Exception:
+        _release_maintenance_run(run_id)
+        raise
+
+    print(f"--- DEV LOG: Database maintenance finished ({rows_archived} rows archived) ---")
+    return rows_archived
+
+def run_scheduled_maintenance(interval_hours=MAINTENANCE_INTERVAL_HOURS):
+    """Runs run_maintenance() unless another process is running it or already ran it within `interval_hours`."""
+    return run_maintenance(interval_hours=interval_hours) is not None
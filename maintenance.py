@@ -0,0 +1,32 @@
+"""
+Database maintenance for TaleemAI: history compaction/archival, incremental vacuum and statistics refresh.
+
+Run it from cron (or any scheduler) rather than from the app, e.g. every hour:
+    0 * * * * cd /path/to/TaleemAI && python maintenance.py
+
+    python maintenance.py            # Runs only if no other run happened in the last MAINTENANCE_INTERVAL_HOURS
+    python maintenance.py --force    # Runs now regardless of the schedule (still skips if another run is in progress)
+    python maintenance.py --migrate  # One-time full VACUUM to enable incremental auto_vacuum (stop the app first)
+"""
+import argparse
+import database as db
+
+def main():
+    parser = argparse.ArgumentParser(description="Run TaleemAI database maintenance.")
+    parser.add_argument("--force", action="store_true", help="Ignore the schedule and run maintenance now.")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Switch an existing database to incremental auto_vacuum (full VACUUM, locks the database).")
+    args = parser.parse_args()
+
+    db.init_db()
+    if args.migrate:
+        db.migrate_auto_vacuum()
+        return
+    if args.force:
+        if db.run_maintenance() is None:
+            print("--- DEV LOG: Another maintenance run is in progress, skipping ---")
+    elif not db.run_scheduled_maintenance():
+        print("--- DEV LOG: Maintenance is in progress or already ran recently, skipping ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import glob
+import gzip
+import sqlite3
+
+import pytest
+
+import database as db
+
+BOARD, GRADE, SUBJECT = "Federal Board", "9th Grade", "Physics"
+TOPICS = ["Friction", "Torque", "Density", "Power"]
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "taleemai.db"))
+    db.init_db()
+    return tmp_path
+
+def _add_history(user_id, topic, answers, timestamp):
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.executemany("""
+    INSERT INTO quiz_history (user_id, board, grade, subject, topic, question, user_answer, correct_answer, is_correct, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(user_id, BOARD, GRADE, SUBJECT, topic, f"Q{i}", "A" if ok else "B", "A", ok, timestamp)
+          for i, ok in enumerate(answers)])
+    conn.commit()
+    conn.close()
+
+def _seed():
+    users = [db.create_user("old_and_new"), db.create_user("only_old")]
+    for n, topic in enumerate(TOPICS):
+        # Old answers on every topic, plus a rerun of half of them inside the retention window
+        _add_history(users[0], topic, [True] * (n + 5) + [False] * (7 - n), "2020-01-01 10:00:00")
+        if n % 2 == 0:
+            _add_history(users[0], topic, [False] * 6 + [True] * 4, "2999-01-01 10:00:00")
+        _add_history(users[1], topic, [n % 2 == 0] * (9 + n), f"2021-0{n + 1}-01 10:00:00")
+    return users
+
+def _snapshot(user_id):
+    return (
+        db.get_deep_subject_preparation(user_id, BOARD, GRADE),
+        db.get_weakest_topics_for_subject(user_id, BOARD, GRADE, SUBJECT, limit=len(TOPICS)),
+        sorted(map(tuple, (c.values() for c in db.get_distinct_classes_for_user(user_id)))),
+        db.get_most_recent_class(user_id),
+    )
+
+def _count_rows():
+    conn = sqlite3.connect(db.DB_NAME)
+    count = conn.execute("SELECT COUNT(*) FROM quiz_history").fetchone()[0]
+    conn.close()
+    return count
+
+def test_compaction_keeps_results_and_archives_every_row(temp_db):
+    users = _seed()
+    before = [_snapshot(user_id) for user_id in users]
+    rows_before = _count_rows()
+
+    archive_dir = str(temp_db / "archive")
+    archived = db.compact_quiz_history(retention_days=90, archive_dir=archive_dir, batch_size=7)
+
+    assert [_snapshot(user_id) for user_id in users] == before
+    assert archived == rows_before - _count_rows() > 0
+    assert glob.glob(f"{archive_dir}/*.tmp") == []
+    archived_lines = 0
+    for path in glob.glob(f"{archive_dir}/*.jsonl.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            archived_lines += sum(1 for _ in f)
+    assert archived_lines == archived
+
+    # Nothing left to fold on a second run
+    assert db.compact_quiz_history(retention_days=90, archive_dir=archive_dir, batch_size=7) == 0
+
+def test_failed_compaction_keeps_rows_and_leaves_no_archive(temp_db):
+    _seed()
+    rows_before = _count_rows()
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("""
+    CREATE TRIGGER fail_summary BEFORE INSERT ON quiz_history_summary
+    BEGIN SELECT RAISE(ABORT, 'disk full'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    archive_dir = temp_db / "archive"
+    with pytest.raises(sqlite3.IntegrityError):
+        db.compact_quiz_history(retention_days=90, archive_dir=str(archive_dir))
+    assert _count_rows() == rows_before
+    assert list(archive_dir.iterdir()) == []
+
+def test_scheduled_maintenance_runs_once_per_interval(temp_db, monkeypatch):
+    monkeypatch.chdir(temp_db)  # ARCHIVE_DIR is relative
+    assert db.run_scheduled_maintenance(24) is True
+    assert db.run_scheduled_maintenance(24) is False
+
+def test_forced_run_skips_while_another_is_in_progress(temp_db):
+    assert db._claim_maintenance_run(24) is not None
+    assert db._claim_maintenance_run(0) is None
+    assert db.run_maintenance(archive_dir=str(temp_db / "archive")) is None
+
+def test_failed_maintenance_releases_its_claim(temp_db, monkeypatch):
+    monkeypatch.chdir(temp_db)
+    _seed()
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("""
+    CREATE TRIGGER fail_summary BEFORE INSERT ON quiz_history_summary
+    BEGIN SELECT RAISE(ABORT, 'disk full'); END
+    """)
+    conn.commit()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.run_scheduled_maintenance(24)
+    assert conn.execute("SELECT COUNT(*) FROM maintenance_runs").fetchone()[0] == 0
+
+    conn.execute("DROP TRIGGER fail_summary")
+    conn.commit()
+    conn.close()
+    assert db.run_scheduled_maintenance(24) is True
+
+def test_init_db_upgrades_old_maintenance_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "taleemai.db"))
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("CREATE TABLE maintenance_runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, ran_at DATETIME DEFAULT CURRENT_TIMESTAMP, rows_archived INTEGER NOT NULL)")
+    conn.execute("INSERT INTO maintenance_runs (rows_archived) VALUES (3)")
+    conn.commit()
+
+    db.init_db()
+    assert conn.execute("SELECT finished_at = ran_at FROM maintenance_runs").fetchone()[0] == 1
+    conn.close()
+
+def test_maintenance_reclaims_free_pages(temp_db):
+    user_id = db.create_user("bulk")
+    for topic in TOPICS:
+        _add_history(user_id, topic, [True, False] * 500, "2020-01-01 10:00:00")
+
+    db.run_maintenance(retention_days=90, archive_dir=str(temp_db / "archive"))
+
+    conn = sqlite3.connect(db.DB_NAME)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    conn.close()